@@ -14,7 +14,6 @@ DATA_DIR.mkdir(exist_ok=True)
 INTENT_MODEL_PATH = MODELS_DIR / "intent_model.joblib"
 VECTORIZER_PATH = MODELS_DIR / "vectorizer.joblib"
 NER_MODEL_PATH = MODELS_DIR / "ner_model.joblib"
-FAISS_INDEX_PATH = MODELS_DIR / "faiss_index.joblib"
 
 # Data file paths
 KNOWLEDGE_GRAPH_PATH = DATA_DIR / "knowledge_graph.json"
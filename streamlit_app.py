@@ -1,16 +1,27 @@
+import os
+
+# Single-threaded BLAS: each query only does small matrix products, and
+# concurrent sessions would otherwise oversubscribe the cores.
+# Only effective before numpy is first imported (see README).
+for _var in ("OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "OMP_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
 import streamlit as st
-import joblib
-import json
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 import sys
 
 # Add utils to path
 sys.path.append(str(Path(__file__).parent))
 
-from utils.nlp_utils import NLPProcessor
-from utils.data_utils import KnowledgeGraphRetriever, load_wellness_tips, load_medical_terms
-from utils.recommender import WellnessRecommender
-from utils.report_processor import MedicalReportProcessor
+from utils.nlp_utils import STRESS_ACTION_PATTERN, STRESS_PATTERN, emergency_response_type
+
+if TYPE_CHECKING:
+    from utils.nlp_utils import NLPProcessor
+    from utils.data_utils import KnowledgeGraphRetriever
+    from utils.recommender import WellnessRecommender
+    from utils.report_processor import MedicalReportProcessor
 
 # Page configuration
 st.set_page_config(
@@ -51,42 +62,53 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@dataclass(frozen=True)
+class Models:
+    """Loaded ML components shared by every session."""
+    nlp_processor: "NLPProcessor"
+    kg_retriever: "KnowledgeGraphRetriever"
+    recommender: "WellnessRecommender"
+    report_processor: "MedicalReportProcessor"
+
+
 @st.cache_resource
-def load_models():
-    """Load all ML models and data (cached for performance)."""
-    try:
-        # Initialize NLP processor
-        nlp_processor = NLPProcessor(
-            "models/intent_model.joblib",
-            "models/vectorizer.joblib"
-        )
-        
-        # Initialize knowledge graph retriever
-        kg_retriever = KnowledgeGraphRetriever(
-            "models/faiss_index.joblib",
-            "data/knowledge_graph.json"
-        )
-        
-        # Load wellness tips and medical terms
-        wellness_tips = load_wellness_tips()
-        medical_terms = load_medical_terms()
-        
-        # Initialize recommender
-        recommender = WellnessRecommender(wellness_tips)
-        
-        # Initialize report processor
-        report_processor = MedicalReportProcessor(medical_terms)
-        
-        return {
-            'nlp_processor': nlp_processor,
-            'kg_retriever': kg_retriever,
-            'recommender': recommender,
-            'report_processor': report_processor
-        }
-    except Exception as e:
-        st.error(f"Error loading models: {str(e)}")
-        st.info("Please ensure all model files are in the 'models' and 'data' directories.")
-        return None
+def get_models() -> Models:
+    """
+    Load all ML models and data once per process (cached for performance).
+    
+    Errors propagate instead of being cached, so a failed load is retried
+    on the next rerun.
+    """
+    # Imported here so script reruns don't pay for model dependencies
+    from threadpoolctl import threadpool_limits
+    from utils.nlp_utils import NLPProcessor
+    from utils.data_utils import KnowledgeGraphRetriever, load_wellness_tips, load_medical_terms
+    from utils.recommender import WellnessRecommender
+    from utils.report_processor import MedicalReportProcessor
+    
+    # Streamlit has already imported numpy, so also cap BLAS threads at runtime
+    threadpool_limits(limits=1)
+    
+    # Initialize NLP processor
+    nlp_processor = NLPProcessor(
+        "models/intent_model.joblib",
+        "models/vectorizer.joblib",
+        "data/knowledge_graph.json"
+    )
+    
+    # Initialize knowledge graph retriever
+    kg_retriever = KnowledgeGraphRetriever("data/knowledge_graph.json")
+    
+    # Load wellness tips and medical terms
+    wellness_tips = load_wellness_tips()
+    medical_terms = load_medical_terms()
+    
+    return Models(
+        nlp_processor=nlp_processor,
+        kg_retriever=kg_retriever,
+        recommender=WellnessRecommender(wellness_tips),
+        report_processor=MedicalReportProcessor(medical_terms)
+    )
 
 
 def initialize_session_state():
@@ -102,23 +124,22 @@ def initialize_session_state():
         }
 
 
-def process_chat_query(query: str, models: dict) -> dict:
+def process_chat_query(query: str) -> dict:
     """Process user chat query through the AI pipeline."""
+    # Emergency detection always runs; only normal answers are cached
+    alert_result = _emergency_check(query)
+    if alert_result is not None:
+        return alert_result
     
+    return _normal_pipeline(query)
+
+
+def _emergency_check(query: str) -> Optional[dict]:
+    """Return an emergency/crisis response if the query needs one, else None."""
     # EMERGENCY DETECTION
-    emergency_keywords = [
-        'chest pain', 'chest pressure', 'crushing chest', 'tight chest',
-        'pain radiating', 'pain down arm', 'pain in jaw',
-        'shortness of breath', 'difficulty breathing', 'can\'t breathe',
-        'sudden severe headache', 'worst headache',
-        'confusion', 'slurred speech', 'face drooping', 'arm weakness',
-        'severe bleeding', 'suicidal', 'want to die', 'kill myself'
-    ]
-    
-    query_lower = query.lower()
-    is_emergency = any(keyword in query_lower for keyword in emergency_keywords)
-    
-    if is_emergency and ('chest' in query_lower or 'heart' in query_lower or 'arm' in query_lower):
+    response_type = emergency_response_type(query.lower())
+    
+    if response_type == 'cardiac':
         return {
             'response': """🚨 **EMERGENCY - CALL 112 IMMEDIATELY** 🚨
 
@@ -139,7 +160,7 @@ While waiting for emergency services:
             'sources': []
         }
     
-    if any(word in query_lower for word in ['suicidal', 'kill myself', 'want to die', 'end my life']):
+    if response_type == 'crisis':
         return {
             'response': """🆘 **CRISIS SUPPORT AVAILABLE** 🆘
 
@@ -153,15 +174,29 @@ Trained professionals are ready to help you right now. Please reach out.""",
             'entities': {'crisis': True},
             'sources': []
         }
-        # STRESS/ANXIETY OVERRIDE
-    if 'stress' in query_lower or 'anxiety' in query_lower or 'anxious' in query_lower:
-        if any(word in query_lower for word in ['reduce', 'manage', 'help', 'cope', 'deal', 'relieve', 'handle']):
-            entities = models['nlp_processor'].extract_entities(query)
-            kg_results = models['kg_retriever'].search(query, top_k=5)
-            kg_results = [r for r in kg_results if r.get('category') in ['mental_health', 'wellness']][:3]
+    
+    return None
+
+
+@st.cache_data(ttl=24 * 60 * 60, max_entries=1000, show_spinner=False)
+def _normal_pipeline(query: str) -> dict:
+    """Run intent, entity and knowledge graph pipeline (cached per query text)."""
+    models = get_models()
+    
+    # Sanitize once; intent and entities come from that single prepared query
+    nlp_result = models.nlp_processor.process(query)
+    processed = nlp_result.query
+    query_lower = processed.lower
+    entities = nlp_result.entities
+    candidates = models.kg_retriever.search(processed, top_k=5)  # Get more results
+    
+    # STRESS/ANXIETY OVERRIDE
+    if STRESS_PATTERN.search(query_lower):
+        if STRESS_ACTION_PATTERN.search(query_lower):
+            kg_results = [r for r in candidates if r.category in ['mental_health', 'wellness']][:3]
             
             if not kg_results:
-                kg_results = models['kg_retriever'].search(query, top_k=3)
+                kg_results = candidates[:3]
             
             response = generate_mental_health_response(kg_results)
             
@@ -173,24 +208,23 @@ Trained professionals are ready to help you right now. Please reach out.""",
                 'sources': kg_results
             }
     # Normal processing
-    intent, confidence = models['nlp_processor'].predict_intent(query)
-    entities = models['nlp_processor'].extract_entities(query)
-    kg_results = models['kg_retriever'].search(query, top_k=5)  # Get more results
+    intent, confidence = nlp_result.intent, nlp_result.confidence
+    kg_results = candidates
     
     # FILTER results by category based on intent
     if intent == 'symptom_checker':
-        kg_results = [r for r in kg_results if r.get('category') == 'symptom'][:3]
+        kg_results = [r for r in kg_results if r.category == 'symptom'][:3]
     elif intent == 'medication_explainer':
-        kg_results = [r for r in kg_results if r.get('category') == 'medication'][:3]
+        kg_results = [r for r in kg_results if r.category == 'medication'][:3]
     elif intent == 'general_wellness':
-        kg_results = [r for r in kg_results if r.get('category') == 'wellness'][:3]
+        kg_results = [r for r in kg_results if r.category == 'wellness'][:3]
     elif intent == 'mental_health':
         # Accept both mental_health and wellness for mental health queries
-        kg_results = [r for r in kg_results if r.get('category') in ['mental_health', 'wellness']][:3]
+        kg_results = [r for r in kg_results if r.category in ['mental_health', 'wellness']][:3]
     
-    # If filtering removed all results, use original top 3
+    # If filtering removed all results, use original top 3 (already ranked above)
     if not kg_results:
-        kg_results = models['kg_retriever'].search(query, top_k=3)
+        kg_results = candidates[:3]
     
     # Generate response based on intent
     if intent == 'symptom_checker':
@@ -217,7 +251,7 @@ def generate_symptom_response(query: str, kg_results: list, entities: dict) -> s
     """Generate response for symptom checker queries."""
     if kg_results:
         main_result = kg_results[0]
-        response = f"**Based on what you've described:**\n\n{main_result['content']}\n\n"
+        response = f"**Based on what you've described:**\n\n{main_result.content}\n\n"
         
         if entities['symptoms']:
             response += f"**Identified symptoms:** {', '.join(entities['symptoms'])}\n\n"
@@ -233,7 +267,7 @@ def generate_medication_response(kg_results: list) -> str:
     """Generate response for medication-related queries."""
     if kg_results:
         main_result = kg_results[0]
-        response = f"**Medication Information:**\n\n{main_result['content']}\n\n"
+        response = f"**Medication Information:**\n\n{main_result.content}\n\n"
         response += "💊 **Remember:** Always take medications as prescribed by your healthcare provider. Never adjust dosages without consulting your doctor."
         return response
     else:
@@ -244,7 +278,7 @@ def generate_wellness_response(kg_results: list) -> str:
     """Generate response for general wellness queries."""
     if kg_results:
         main_result = kg_results[0]
-        response = f"**Wellness Advice:**\n\n{main_result['content']}\n\n"
+        response = f"**Wellness Advice:**\n\n{main_result.content}\n\n"
         response += "✨ Remember, small consistent changes lead to lasting improvements in health!"
         return response
     else:
@@ -255,7 +289,7 @@ def generate_mental_health_response(kg_results: list) -> str:
     """Generate response for mental health queries."""
     if kg_results:
         main_result = kg_results[0]
-        response = f"**Mental Health Support:**\n\n{main_result['content']}\n\n"
+        response = f"**Mental Health Support:**\n\n{main_result.content}\n\n"
         response += "🧠 **Support Resources:** If you're in crisis or need immediate help, please contact:\n"
         response += "- Emergency Response Africa (ERA): 0 8000 2255 372\n"
         response += "- Your local emergency services: 112"
@@ -300,11 +334,12 @@ def main():
     
     # Load models
     with st.spinner("Loading AI models..."):
-        models = load_models()
-    
-    if models is None:
-        st.error("Failed to load models. Please check your setup.")
-        st.stop()
+        try:
+            models = get_models()
+        except Exception as e:
+            st.error(f"Error loading models: {str(e)}")
+            st.info("Please ensure all model files are in the 'models' and 'data' directories.")
+            st.stop()
     
     # Sidebar
     with st.sidebar:
@@ -346,7 +381,7 @@ def main():
         render_report_simplifier(models)
 
 
-def render_chat_interface(models: dict):
+def render_chat_interface(models: Models):
     """Render the chat interface."""
     st.header("💬 Chat with HealthWise AI")
     
@@ -379,7 +414,7 @@ def render_chat_interface(models: dict):
         
         # Process query
         with st.spinner("🤔 Thinking..."):
-            result = process_chat_query(user_input, models)
+            result = process_chat_query(user_input)
         
         # Add bot response to history
         st.session_state.chat_history.append({
@@ -416,7 +451,7 @@ def render_chat_interface(models: dict):
             })
             # Process immediately
             with st.spinner("🤔 Thinking..."):
-                result = process_chat_query('How can I improve my sleep?', models)
+                result = process_chat_query('How can I improve my sleep?')
             # Add response
             st.session_state.chat_history.append({
                 'role': 'assistant',
@@ -431,7 +466,7 @@ def render_chat_interface(models: dict):
                 'content': 'How can I reduce stress?'
             })
             with st.spinner("🤔 Thinking..."):
-                result = process_chat_query('How can I reduce stress?', models)
+                result = process_chat_query('How can I reduce stress?')
             st.session_state.chat_history.append({
                 'role': 'assistant',
                 'content': result['response']
@@ -445,19 +480,19 @@ def render_chat_interface(models: dict):
                 'content': 'Tips for healthy eating?'
             })
             with st.spinner("🤔 Thinking..."):
-                result = process_chat_query('Tips for healthy eating?', models)
+                result = process_chat_query('Tips for healthy eating?')
             st.session_state.chat_history.append({
                 'role': 'assistant',
                 'content': result['response']
             })
             st.experimental_rerun()
 
-def render_recommendations(models: dict):
+def render_recommendations(models: Models):
     """Render personalized recommendations."""
     st.header("🎁 Your Personalized Wellness Recommendations")
     
     # Get recommendation
-    recommendation = models['recommender'].get_recommendation(st.session_state.user_profile)
+    recommendation = models.recommender.get_recommendation(st.session_state.user_profile)
     
     # Display recommendation
     tip = recommendation['tip']
@@ -492,7 +527,7 @@ def render_recommendations(models: dict):
     }
     
     if st.button("Check for Nudges 🔍"):
-        should_nudge, nudge_type = models['recommender'].check_proactive_nudge(user_data)
+        should_nudge, nudge_type = models.recommender.check_proactive_nudge(user_data)
         
         if should_nudge:
             st.warning(f"⚠️ **Health Nudge:** We noticed you might benefit from {nudge_type.replace('_', ' ')} guidance. Check the chat for personalized tips!")
@@ -500,7 +535,7 @@ def render_recommendations(models: dict):
             st.success("✅ **Great job!** You're maintaining healthy habits. Keep it up!")
 
 
-def render_report_simplifier(models: dict):
+def render_report_simplifier(models: Models):
     """Render medical report simplification feature."""
     st.header("📄 Simplify Your Medical Report")
     
@@ -518,18 +553,26 @@ def render_report_simplifier(models: dict):
         
         with col1:
             st.subheader("📸 Uploaded Report")
-            from PIL import Image
-            image = Image.open(uploaded_file)
-            st.image(image, use_column_width=True)
+            st.image(uploaded_file, use_column_width=True)
         
         # Process button
         if st.button("🔍 Extract & Simplify", type="primary"):
             with st.spinner("Processing your report..."):
+                from PIL import Image
+                image = Image.open(uploaded_file)
+                # Let JPEGs decode straight to grayscale at a reduced DCT scale for OCR.
+                # draft() keeps both sides at least the requested size, so ask for the
+                # 1600px-long-side size (a 4000x3000 photo then decodes at 2000x1500)
+                fit = 1600 / max(image.size)
+                image.draft('L', (max(1, int(image.width * fit)), max(1, int(image.height * fit))))
+                image = image.convert('L')
+                image.thumbnail((1600, 1600))
+                
                 # Extract text
-                extracted_text = models['report_processor'].extract_text_from_image(image)
+                extracted_text = models.report_processor.extract_text_from_image(image)
                 
                 # Simplify terms
-                result = models['report_processor'].simplify_medical_terms(extracted_text)
+                result = models.report_processor.simplify_medical_terms(extracted_text)
             
             with col2:
                 st.subheader("📝 Simplified Report")
@@ -0,0 +1,95 @@
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.nlp_utils import (
+    CRISIS_KEYWORDS, EMERGENCY_KEYWORDS, detect_alerts, emergency_response_type
+)
+
+
+def reference_alerts(text_lower):
+    """Alerts as originally computed: one `in` test per keyword."""
+    alerts = set()
+    if any(keyword in text_lower for keyword in EMERGENCY_KEYWORDS):
+        alerts.add('emergency')
+    if any(keyword in text_lower for keyword in CRISIS_KEYWORDS):
+        alerts.add('crisis')
+    return alerts
+
+
+class DetectAlertsTest(unittest.TestCase):
+    """Emergency and crisis phrase detection."""
+
+    def test_every_emergency_phrase(self):
+        for keyword in EMERGENCY_KEYWORDS:
+            with self.subTest(keyword=keyword):
+                self.assertIn('emergency', detect_alerts(f"help, {keyword} since this morning"))
+
+    def test_every_crisis_phrase(self):
+        for keyword in CRISIS_KEYWORDS:
+            with self.subTest(keyword=keyword):
+                self.assertIn('crisis', detect_alerts(f"i feel like {keyword}"))
+
+    def test_phrases_in_both_lists(self):
+        for keyword in ['suicidal', 'kill myself', 'want to die']:
+            with self.subTest(keyword=keyword):
+                self.assertEqual(detect_alerts(f"i am {keyword}"), {'emergency', 'crisis'})
+
+    def test_crisis_only_phrase(self):
+        self.assertEqual(detect_alerts("i want to end my life"), {'crisis'})
+
+    def test_phrase_inside_longer_text(self):
+        self.assertEqual(detect_alerts("crushing chest pain"), {'emergency'})
+        self.assertEqual(detect_alerts("sudden severe headache and slurred speech"), {'emergency'})
+
+    def test_negatives(self):
+        for text in ["", "i have a mild headache", "how do i sleep better",
+                     "my chest feels fine", "i want to sleep", "end of my shift"]:
+            with self.subTest(text=text):
+                self.assertEqual(detect_alerts(text), set())
+
+    def test_matches_reference(self):
+        texts = [
+            "pain down arm and chest pressure", "i'm confused about my pills",
+            "suicidal thoughts", "i can't breathe well", "worst headache of my life",
+            "face drooping on one side", "want to diet not die", "kill myself",
+            "severe bleeding from cut", "shortness of breath when walking",
+            "tight chested shirt", "the end my life coach said"
+        ] + [keyword + keyword for keyword in EMERGENCY_KEYWORDS + CRISIS_KEYWORDS]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertEqual(detect_alerts(text), reference_alerts(text))
+
+
+class EmergencyResponseTypeTest(unittest.TestCase):
+    """Choice between the cardiac and crisis responses."""
+
+    def test_cardiac(self):
+        for text in ["crushing chest pain", "pain down arm and sweating",
+                     "pain in jaw and shortness of breath", "heart racing, can't breathe"]:
+            with self.subTest(text=text):
+                self.assertEqual(emergency_response_type(text), 'cardiac')
+
+    def test_words_containing_arm_are_not_cardiac(self):
+        self.assertIsNone(emergency_response_type("severe bleeding from my forearm"))
+        self.assertEqual(emergency_response_type("i am suicidal and want to harm myself"), 'crisis')
+        self.assertEqual(emergency_response_type("suicidal since my alarm went off"), 'crisis')
+
+    def test_cardiac_takes_priority_over_crisis(self):
+        self.assertEqual(emergency_response_type("suicidal and my heart hurts"), 'cardiac')
+
+    def test_crisis_only(self):
+        self.assertEqual(emergency_response_type("i want to end my life"), 'crisis')
+
+    def test_other_emergencies_use_normal_pipeline(self):
+        self.assertIsNone(emergency_response_type("slurred speech and confusion"))
+
+    def test_no_alert(self):
+        self.assertIsNone(emergency_response_type("my arm is sore after the gym"))
+
+
+if __name__ == '__main__':
+    unittest.main()
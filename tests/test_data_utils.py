@@ -0,0 +1,106 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.data_utils import KnowledgeGraphRetriever
+from utils.nlp_utils import ProcessedQuery
+
+KNOWLEDGE_GRAPH_PATH = str(ROOT / "data" / "knowledge_graph.json")
+
+QUERIES = [
+    "I have a headache and fever", "what is metformin used for",
+    "how can I reduce stress", "chest pain when climbing stairs", "malaria prevention"
+]
+
+
+class RetrieverCacheTest(unittest.TestCase):
+    """On-disk TF-IDF cache: cold fit, warm load and recovery from bad files."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.paths = {
+            'vectorizer_cache_path': os.path.join(self.tmp, "tfidf.joblib"),
+            'matrix_cache_path': os.path.join(self.tmp, "tfidf_matrix.npz"),
+            'hash_cache_path': os.path.join(self.tmp, "tfidf.sha256")
+        }
+
+    def make_retriever(self):
+        return KnowledgeGraphRetriever(KNOWLEDGE_GRAPH_PATH, **self.paths)
+
+    def assert_same_results(self, first, second):
+        for query in QUERIES:
+            with self.subTest(query=query):
+                self.assertEqual(first.search(query, top_k=5), second.search(query, top_k=5))
+
+    def test_warm_load_matches_cold_fit(self):
+        cold = self.make_retriever()
+        self.assertTrue(all(os.path.exists(path) for path in self.paths.values()))
+        self.assertEqual(sorted(os.listdir(self.tmp)),
+                         sorted(os.path.basename(path) for path in self.paths.values()))
+
+        warm = self.make_retriever()
+        self.assertEqual(warm.tfidf_matrix.shape, cold.tfidf_matrix.shape)
+        self.assert_same_results(cold, warm)
+
+    def test_unreadable_fingerprint_refits(self):
+        cold = self.make_retriever()
+        with open(self.paths['hash_cache_path'], 'wb') as f:
+            f.write(b'\xff\xfe not a fingerprint')
+
+        refit = self.make_retriever()
+        self.assert_same_results(cold, refit)
+
+    def test_corrupt_matrix_refits(self):
+        cold = self.make_retriever()
+        with open(self.paths['matrix_cache_path'], 'wb') as f:
+            f.write(b'truncated')
+
+        refit = self.make_retriever()
+        self.assert_same_results(cold, refit)
+        self.assert_same_results(cold, self.make_retriever())
+
+
+class SearchBatchTest(unittest.TestCase):
+    """search_batch against per-query search."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.retriever = KnowledgeGraphRetriever(
+            KNOWLEDGE_GRAPH_PATH,
+            vectorizer_cache_path=os.path.join(cls.tmp, "tfidf.joblib"),
+            matrix_cache_path=os.path.join(cls.tmp, "tfidf_matrix.npz"),
+            hash_cache_path=os.path.join(cls.tmp, "tfidf.sha256")
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def test_matches_search(self):
+        queries = QUERIES + ["", "zzz unknown words", "HEADACHE"]
+        for top_k in (1, 3, 5):
+            with self.subTest(top_k=top_k):
+                self.assertEqual(
+                    self.retriever.search_batch(queries, top_k=top_k),
+                    [self.retriever.search(query, top_k=top_k) for query in queries]
+                )
+
+    def test_accepts_processed_queries(self):
+        processed = [ProcessedQuery(sanitized=query, lower=query.lower()) for query in QUERIES]
+        self.assertEqual(self.retriever.search_batch(processed), self.retriever.search_batch(QUERIES))
+
+    def test_edge_cases(self):
+        self.assertEqual(self.retriever.search_batch([]), [])
+        self.assertEqual(self.retriever.search_batch(QUERIES[:2], top_k=0), [[], []])
+
+
+if __name__ == '__main__':
+    unittest.main()
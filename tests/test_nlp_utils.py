@@ -0,0 +1,157 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.nlp_utils import NLPProcessor
+
+
+def make_processor():
+    return NLPProcessor(
+        str(ROOT / "models" / "intent_model.joblib"),
+        str(ROOT / "models" / "vectorizer.joblib"),
+        str(ROOT / "data" / "knowledge_graph.json")
+    )
+
+
+class EntityExtractionTest(unittest.TestCase):
+    """Gazetteer entity extraction on everyday chat text."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.nlp = make_processor()
+
+    def test_everyday_words_are_not_symptoms(self):
+        entities = self.nlp.extract_entities("I want to get fit, I have no energy")
+        self.assertEqual(entities['symptoms'], [])
+
+        entities = self.nlp.extract_entities("It is hot and I feel tired")
+        self.assertEqual(entities['symptoms'], ['tired'])
+
+    def test_acronym_lookalikes_are_not_medications(self):
+        entities = self.nlp.extract_entities("Al says the act of kindness is art, sp?")
+        self.assertEqual(entities['medications'], [])
+        self.assertEqual(entities['symptoms'], [])
+
+        entities = self.nlp.extract_entities("New hearing aids help")
+        self.assertEqual(entities['symptoms'], [])
+
+    def test_acronyms_match_in_capitals(self):
+        entities = self.nlp.extract_entities("Give ORS for diarrhea, she has HIV")
+        self.assertEqual(entities['medications'], ['ORS'])
+        self.assertEqual(entities['symptoms'], ['diarrhea', 'HIV'])
+
+    def test_keywords_use_their_own_kind(self):
+        entities = self.nlp.extract_entities(
+            "hypoglycemia and inflammation, carry an epipen and antiretroviral drugs"
+        )
+        self.assertEqual(entities['symptoms'], ['hypoglycemia', 'inflammation'])
+        self.assertEqual(entities['medications'], ['epipen', 'antiretroviral'])
+
+    def test_batch_matches_single(self):
+        texts = ["I want to get fit", "Took Ibuprofen for a Headache", "It is hot"]
+        self.assertEqual(
+            self.nlp.extract_entities_batch(texts),
+            [self.nlp.extract_entities(text) for text in texts]
+        )
+
+
+class IntentRuleTest(unittest.TestCase):
+    """Keyword rules in NLPProcessor.predict_intent."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.nlp = make_processor()
+
+    def test_compound_aches_are_symptoms(self):
+        for text in ["toothache since yesterday", "bad backache", "stomachache after lunch",
+                     "my earache is worse", "headache", "Headaches every morning",
+                     "my muscles ache"]:
+            with self.subTest(text=text):
+                self.assertEqual(self.nlp.predict_intent(text), ('symptom_checker', 0.90))
+
+    def test_keywords_inside_other_words_do_not_fire(self):
+        # "eat" in "great", "take" in "mistake", "deal" in "ideal"
+        cases = [
+            ("That sounds great, how to improve it", ('general_wellness', 0.90)),
+            ("what is my mistake", ('medication_explainer', 0.95)),
+            ("I am stressed about my ideal weight", ('mental_health', 0.95))
+        ]
+        for text, rule_result in cases:
+            with self.subTest(text=text):
+                self.assertNotEqual(self.nlp.predict_intent(text), rule_result)
+
+    def test_rules_still_fire_on_whole_words(self):
+        self.assertEqual(self.nlp.predict_intent("what is metformin used for"),
+                         ('medication_explainer', 0.95))
+        self.assertEqual(self.nlp.predict_intent("how to reduce stress"), ('mental_health', 0.95))
+        self.assertEqual(self.nlp.predict_intent("how to eat better"), ('general_wellness', 0.90))
+
+
+class ProcessTest(unittest.TestCase):
+    """NLPProcessor.process, the single entry point used by the chat pipeline."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.nlp = make_processor()
+
+    def test_matches_separate_calls(self):
+        for text in ["I have a headache and fever", "what is metformin used for",
+                     "tell me something nice", "  How can I reduce stress?  "]:
+            with self.subTest(text=text):
+                result = self.nlp.process(text)
+                self.assertEqual((result.intent, result.confidence), self.nlp.predict_intent(text))
+                self.assertEqual(result.entities, self.nlp.extract_entities(text))
+                self.assertEqual(result.query, self.nlp.prepare_query(text))
+
+    def test_sanitizes_once(self):
+        result = self.nlp.process("  chest\npain\x00  " + "x" * 2000)
+        self.assertTrue(result.query.sanitized.startswith("chest pain"))
+        self.assertEqual(len(result.query.sanitized), 1000)
+        self.assertEqual(result.query.lower, result.query.sanitized.lower())
+        self.assertEqual(result.entities['symptoms'], ['chest pain'])
+
+
+class ModelLoadingTest(unittest.TestCase):
+    """Lazy, shared loading of the intent artifacts."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.paths = []
+        for name in ("intent_model.joblib", "vectorizer.joblib"):
+            self.paths.append(shutil.copy(ROOT / "models" / name, self.tmp))
+        self.paths.append(str(ROOT / "data" / "knowledge_graph.json"))
+
+    def test_instances_share_unchanged_artifacts(self):
+        first = NLPProcessor(*self.paths)
+        second = NLPProcessor(*self.paths)
+        self.assertIs(first.intent_model, second.intent_model)
+        self.assertIs(first.vectorizer, second.vectorizer)
+
+    def test_new_instance_picks_up_retrained_model(self):
+        import joblib
+
+        old = NLPProcessor(*self.paths)
+        old_model = old.intent_model
+        joblib.dump({'retrained': True}, self.paths[0])
+        stat = os.stat(self.paths[0])
+        os.utime(self.paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        new = NLPProcessor(*self.paths)
+        self.assertEqual(new.intent_model, {'retrained': True})
+        self.assertIs(old.intent_model, old_model)
+        self.assertIs(new.vectorizer, old.vectorizer)
+
+    def test_missing_model_fails_at_construction(self):
+        with self.assertRaises(FileNotFoundError):
+            NLPProcessor(os.path.join(self.tmp, "missing.joblib"), *self.paths[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import itertools
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.recommender import WellnessRecommender
+
+
+class ProactiveNudgeBatchTest(unittest.TestCase):
+    """check_proactive_nudges_batch against the per-user rules."""
+
+    def setUp(self):
+        self.recommender = WellnessRecommender([])
+
+    def test_matches_single_user_rules(self):
+        users = [
+            {'avg_sleep_hours': sleep, 'daily_steps': steps, 'stress_level': stress}
+            for sleep, steps, stress in itertools.product(
+                [4, 5.9, 6, 8], [0, 2999, 3000, 10000], ['low', 'medium', 'high']
+            )
+        ]
+        batch = self.recommender.check_proactive_nudges_batch(
+            [user['avg_sleep_hours'] for user in users],
+            [user['daily_steps'] for user in users],
+            [user['stress_level'] for user in users]
+        )
+
+        self.assertEqual(len(batch), len(users))
+        for user, nudge_type in zip(users, batch):
+            with self.subTest(user=user):
+                should_nudge, expected_type = self.recommender.check_proactive_nudge(user)
+                self.assertEqual(nudge_type, expected_type)
+                self.assertEqual(nudge_type is not None, should_nudge)
+
+    def test_priority_order(self):
+        batch = self.recommender.check_proactive_nudges_batch(
+            [5, 7, 7, 7], [1000, 1000, 1000, 5000], ['high', 'high', 'low', 'low']
+        )
+        self.assertEqual(batch, ["sleep_hygiene", "stress_management", "physical_activity", None])
+
+    def test_empty_batch(self):
+        self.assertEqual(self.recommender.check_proactive_nudges_batch([], [], []), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.report_processor import MedicalReportProcessor, _otsu_threshold
+
+
+class OtsuThresholdTest(unittest.TestCase):
+    """Binarization threshold used before OCR."""
+
+    def test_bimodal_threshold_separates_modes(self):
+        rng = np.random.default_rng(0)
+        ink = rng.normal(50, 10, 20000)
+        paper = rng.normal(200, 15, 80000)
+        gray = np.concatenate([ink, paper]).clip(0, 255).astype(np.uint8)
+
+        threshold = _otsu_threshold(gray)
+        self.assertGreater(threshold, 80)
+        self.assertLess(threshold, 160)
+        self.assertLess((ink.clip(0, 255).astype(np.uint8) > threshold).mean(), 0.01)
+        self.assertGreater((paper.clip(0, 255).astype(np.uint8) > threshold).mean(), 0.99)
+
+    def test_brightest_value_is_never_the_threshold(self):
+        # Pixel totals where the empty-class bins leave a rounding residual
+        pixels = 1600 * 900
+        gray = np.concatenate([
+            np.full(274621, 40),
+            np.full(30516, 128),
+            np.full(pixels - 274621 - 30516, 220)
+        ]).astype(np.uint8)
+
+        threshold = _otsu_threshold(gray)
+        self.assertLess(threshold, 220)
+        self.assertTrue((gray > threshold).any())
+
+    def test_uniform_image(self):
+        self.assertEqual(_otsu_threshold(np.full(100, 255, np.uint8)), 0)
+
+
+class ProcessPagesTest(unittest.TestCase):
+    """Concurrent OCR of multi-page reports."""
+
+    def setUp(self):
+        self.processor = MedicalReportProcessor({
+            "Hypertension": "High blood pressure",
+            "Tachycardia": "Fast heart rate"
+        })
+        self.pages = {
+            "page1": "Diagnosis: hypertension",
+            "page2": "No change since last visit",
+            "page3": "Finding: Tachycardia"
+        }
+
+    def test_pages_are_joined_in_order_and_simplified(self):
+        # Earlier pages finish last; all pages must be in OCR at once to pass the barrier
+        barrier = threading.Barrier(len(self.pages), timeout=5)
+        delays = {"page1": 0.03, "page2": 0.02, "page3": 0.0}
+
+        def fake_ocr(image):
+            barrier.wait()
+            time.sleep(delays[image])
+            return self.pages[image]
+
+        self.processor.extract_text_from_image = fake_ocr
+        result = asyncio.run(self.processor.process_pages(list(self.pages)))
+
+        self.assertEqual(result['original_text'], "\n\n".join(self.pages.values()))
+        self.assertEqual(
+            result['simplified_text'],
+            "Diagnosis: Hypertension (High blood pressure)\n\n"
+            "No change since last visit\n\n"
+            "Finding: Tachycardia (Fast heart rate)"
+        )
+        self.assertEqual([term['complex'] for term in result['terms_found']],
+                         ["Hypertension", "Tachycardia"])
+
+    def test_matches_single_image_path(self):
+        self.processor.extract_text_from_image = self.pages.get
+        result = asyncio.run(self.processor.process_pages(["page3"]))
+        self.assertEqual(result, self.processor.simplify_medical_terms(self.pages["page3"]))
+
+    def test_no_pages(self):
+        result = asyncio.run(self.processor.process_pages([]))
+        self.assertEqual(result['original_text'], "")
+        self.assertEqual(result['terms_found'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,70 +1,229 @@
+import functools
+import hashlib
 import json
+import os
+import tempfile
 import numpy as np
-from typing import Dict, List
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import Dict, List, NamedTuple, Union
+
+from .nlp_utils import ProcessedQuery
+
+# TF-IDF settings (part of the cache fingerprint, so changing them forces a refit)
+# Documents and queries are lowercased by the retriever, so the vectorizer skips it
+_TFIDF_PARAMS = {
+    'lowercase': False,
+    'token_pattern': r"(?u)\b\w\w+\b",
+    'max_features': 1000,
+    'ngram_range': (1, 2),
+    'stop_words': 'english',
+    'dtype': np.float32
+}
+
+def _write_atomic(path, write):
+    """
+    Write a file through a temporary file in the same directory, then rename it into place.
+    
+    Readers (and other processes writing the same cache) only ever see a
+    missing file or a complete one.
+    
+    Args:
+        path: Final file path
+        write: Callable that writes the contents to a binary file object
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or '.', prefix=f'.{name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class KGResult(NamedTuple):
+    """Compact view of a knowledge graph entry returned by search."""
+    topic: str
+    category: str
+    content: str
 
 class KnowledgeGraphRetriever:
     """
     Retrieves relevant information from the medical knowledge graph.
     
-    Uses TF-IDF for efficient keyword-based matching.
+    Uses TF-IDF for efficient keyword-based matching. The fitted vectorizer
+    and document matrix are cached on disk and reused until the knowledge
+    graph (or the TF-IDF settings) change.
     """
     
-    def __init__(self, faiss_index_path, knowledge_graph_path):
-        """Initialize knowledge graph and create TF-IDF index."""
+    def __init__(self, knowledge_graph_path,
+                 vectorizer_cache_path="models/tfidf.joblib",
+                 matrix_cache_path="models/tfidf_matrix.npz",
+                 hash_cache_path="models/tfidf.sha256"):
+        """Initialize knowledge graph and load (or create) TF-IDF index."""
+        # Heavy libraries are imported here so importing this module stays cheap
+        import joblib
+        import scipy.sparse
+        import sklearn
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        
         # Load knowledge graph
-        with open(knowledge_graph_path, 'r') as f:
-            self.knowledge_graph = json.load(f)
+        with open(knowledge_graph_path, 'rb') as f:
+            raw_graph = f.read()
+        knowledge_graph = json.loads(raw_graph)
+        
+        # Store entries column-wise (one list per field, aligned by index)
+        self.topics = [entry['topic'] for entry in knowledge_graph]
+        self.keywords = [entry['keywords'] for entry in knowledge_graph]
+        self.contents = [entry['content'] for entry in knowledge_graph]
+        self.categories = [entry['category'] for entry in knowledge_graph]
+        
+        # Repeated queries (quick actions, retries) reuse their query vector
+        self._vectorize_query = functools.lru_cache(maxsize=512)(self._transform_query)
+        
+        # Fingerprint of everything the fitted index depends on
+        fingerprint = hashlib.sha256(raw_graph)
+        fingerprint.update(repr(sorted(_TFIDF_PARAMS.items())).encode())
+        fingerprint.update(sklearn.__version__.encode())
+        fingerprint = fingerprint.hexdigest()
         
-        # Create searchable text for each entry (keywords weighted heavily)
-        self.documents = []
-        for entry in self.knowledge_graph:
-            # Repeat keywords 5 times for higher weight
-            keywords_weighted = ' '.join(entry['keywords']) * 5
-            searchable_text = f"{entry['topic']} {keywords_weighted} {entry['content']}"
-            self.documents.append(searchable_text)
+        if self._cache_is_valid(hash_cache_path, fingerprint,
+                                vectorizer_cache_path, matrix_cache_path):
+            # Reuse fitted vectorizer and document matrix (refit below if unreadable)
+            try:
+                self.vectorizer = joblib.load(vectorizer_cache_path, mmap_mode='r')
+                self.tfidf_matrix = scipy.sparse.load_npz(matrix_cache_path)
+                expected_shape = (len(self.topics), len(self.vectorizer.vocabulary_))
+                if self.tfidf_matrix.shape != expected_shape:
+                    raise ValueError(f"matrix shape {self.tfidf_matrix.shape}, expected {expected_shape}")
+            except Exception as e:
+                print(f"⚠ Could not load cached TF-IDF index, refitting: {e}")
+            else:
+                print(f"✓ TF-IDF index loaded with {len(self.topics)} entries")
+                return
         
         # Create TF-IDF vectorizer
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,
-            ngram_range=(1, 2),
-            stop_words='english'
-        )
+        self.vectorizer = TfidfVectorizer(**_TFIDF_PARAMS)
         
-        # Fit vectorizer on all documents
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.documents)
+        # Fit vectorizer on all documents (only built when the cache is stale)
+        self.tfidf_matrix = self.vectorizer.fit_transform(self._build_documents())
         
-        print(f"✓ TF-IDF index created with {len(self.knowledge_graph)} entries")
+        # Save for the next start-up: each file is replaced atomically, and the
+        # hash goes last so a fingerprint never points at half-written files
+        try:
+            _write_atomic(vectorizer_cache_path, lambda f: joblib.dump(self.vectorizer, f))
+            _write_atomic(matrix_cache_path,
+                          lambda f: scipy.sparse.save_npz(f, self.tfidf_matrix, compressed=False))
+            _write_atomic(hash_cache_path, lambda f: f.write(fingerprint.encode()))
+        except OSError as e:
+            print(f"⚠ Could not cache TF-IDF index: {e}")
+        
+        print(f"✓ TF-IDF index created with {len(self.topics)} entries")
+    
+    def _build_documents(self) -> List[str]:
+        """Create lowercased searchable text for each entry (keywords repeated 5 times for higher weight)."""
+        return [
+            f"{topic} {' '.join(keywords) * 5} {content}".lower()
+            for topic, keywords, content in zip(self.topics, self.keywords, self.contents)
+        ]
+    
+    @staticmethod
+    def _cache_is_valid(hash_cache_path, fingerprint, *cache_paths) -> bool:
+        """Check whether the cached TF-IDF files match the current fingerprint."""
+        if not all(os.path.exists(path) for path in (hash_cache_path, *cache_paths)):
+            return False
+        try:
+            with open(hash_cache_path, 'r', encoding='ascii') as f:
+                return f.read().strip() == fingerprint
+        except (OSError, UnicodeDecodeError):
+            # Unreadable fingerprint: treat the cache as stale and refit
+            return False
+    
+    @staticmethod
+    def _lower(query: Union[str, ProcessedQuery]) -> str:
+        """Lowercased text of a raw or prepared query."""
+        return query.lower if isinstance(query, ProcessedQuery) else query.lower()
     
-    def search(self, query: str, top_k: int = 3) -> List[Dict]:
+    def _transform_query(self, query_lower: str):
+        """Vectorize one lowercased query (wrapped in a per-instance LRU cache)."""
+        return self.vectorizer.transform([query_lower])
+    
+    def search(self, query: Union[str, ProcessedQuery], top_k: int = 3) -> List[KGResult]:
         """
         Search knowledge graph for relevant information using TF-IDF.
         
         Args:
-            query: User query
+            query: User query (raw text or ProcessedQuery)
             top_k: Number of results to return
             
         Returns:
-            List of relevant knowledge graph entries
+            List of KGResult tuples for the most relevant entries
         """
-        # Vectorize query
-        query_vec = self.vectorizer.transform([query])
+        from sklearn.metrics.pairwise import linear_kernel
+        
+        # Vectorize query (cached per lowercased text)
+        query_vec = self._vectorize_query(self._lower(query))
         
-        # Calculate cosine similarity
-        similarities = cosine_similarity(query_vec, self.tfidf_matrix)[0]
+        # TF-IDF rows are L2-normalized, so cosine similarity is a plain dot product
+        similarities = linear_kernel(query_vec, self.tfidf_matrix)[0]
         
-        # Get top k indices
-        top_indices = similarities.argsort()[-top_k:][::-1]
+        # Get top k indices (partial selection, then sort only those k)
+        k = min(top_k, len(similarities))
+        if k <= 0:
+            return []
+        candidates = np.argpartition(similarities, -k)[-k:]
+        top_indices = candidates[np.argsort(-similarities[candidates])]
         
         # Return matching entries
         results = []
         for idx in top_indices:
-            if idx < len(self.knowledge_graph):
-                results.append(self.knowledge_graph[idx])
+            if idx < len(self.topics):
+                results.append(self._result(idx))
         
         return results
 
+    def search_batch(self, queries: List[Union[str, ProcessedQuery]],
+                     top_k: int = 3) -> List[List[KGResult]]:
+        """
+        Search knowledge graph for several queries at once.
+        
+        All queries are scored with one sparse matrix product instead of
+        one product per query. Results match calling search for each query.
+        
+        Args:
+            queries: User queries (raw text or ProcessedQuery)
+            top_k: Number of results to return per query
+        
+        Returns:
+            List of result lists, one per query (same order as queries)
+        """
+        import scipy.sparse
+        from sklearn.metrics.pairwise import linear_kernel
+        
+        if not queries:
+            return []
+        
+        # Stack the (cached) query vectors and score them in a single product
+        query_matrix = scipy.sparse.vstack([self._vectorize_query(self._lower(query)) for query in queries])
+        similarities = linear_kernel(query_matrix, self.tfidf_matrix)
+        
+        # Get top k indices per query (partial selection, then sort only those k)
+        k = min(top_k, similarities.shape[1])
+        if k <= 0:
+            return [[] for _ in queries]
+        candidates = np.argpartition(similarities, -k, axis=1)[:, -k:]
+        candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+        top_indices = np.take_along_axis(candidates, np.argsort(-candidate_scores, axis=1), axis=1)
+        
+        return [
+            [self._result(idx) for idx in row if idx < len(self.topics)]
+            for row in top_indices
+        ]
+
+    def _result(self, idx: int) -> KGResult:
+        """Build the result for one knowledge graph entry."""
+        return KGResult(self.topics[idx], self.categories[idx], self.contents[idx])
+
 def load_wellness_tips() -> List[Dict]:
     """Load wellness tips from JSON file."""
     with open("data/wellness_tips.json", 'r') as f:
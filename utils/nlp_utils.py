@@ -1,20 +1,322 @@
-import spacy
-import numpy as np
-import joblib
-from typing import Dict, List, Tuple
+import bisect
+import functools
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+# Red-flag phrases that trigger the emergency / crisis responses
+EMERGENCY_KEYWORDS = [
+    'chest pain', 'chest pressure', 'crushing chest', 'tight chest',
+    'pain radiating', 'pain down arm', 'pain in jaw',
+    'shortness of breath', 'difficulty breathing', 'can\'t breathe',
+    'sudden severe headache', 'worst headache',
+    'confusion', 'slurred speech', 'face drooping', 'arm weakness',
+    'severe bleeding', 'suicidal', 'want to die', 'kill myself'
+]
+CRISIS_KEYWORDS = ['suicidal', 'kill myself', 'want to die', 'end my life']
+
+# ASCII control characters (NUL, escapes, line breaks, DEL), replaced by spaces on input
+_CONTROL_CHARS = re.compile(r'[\x00-\x1f\x7f]')
+
+# Longest accepted query (longer input is truncated)
+MAX_QUERY_LENGTH = 1000
+
+# Number of recent texts whose extracted entities are kept per NLPProcessor
+ENTITY_CACHE_SIZE = int(os.environ.get('HW_NLP_CACHE', 2048))
+
+# Body parts that turn an emergency into the cardiac response (word start, so "harm" is not "arm")
+CARDIAC_PATTERN = re.compile(r'\b(?:chest|heart|arm|jaw)')
+
+# Stress/anxiety override: a stress term plus a request for help
+STRESS_PATTERN = re.compile('stress|anxiety|anxious')
+STRESS_ACTION_PATTERN = re.compile('reduce|manage|help|cope|deal|relieve|handle')
+
+# Rule-based intent keyword groups (see NLPProcessor.predict_intent for how they combine).
+# Keywords match at the start of a word, so "eat" matches "eating" but not "great".
+INTENT_RULE_KEYWORDS = {
+    # Mental Health & Stress (Priority 1)
+    'stress_keywords': frozenset({'stress', 'stressed', 'anxiety', 'anxious', 'panic', 'worry',
+                                  'worried', 'overwhelm', 'nervous', 'fear', 'depression',
+                                  'depressed', 'sad', 'hopeless', 'burnout'}),
+    'stress_actions': frozenset({'reduce', 'manage', 'cope', 'deal', 'handle', 'help', 'relief'}),
+    # Medication Queries (Priority 2)
+    'med_keywords': frozenset({'medication', 'medicine', 'drug', 'pill', 'prescription',
+                               'metformin', 'aspirin', 'ibuprofen', 'lisinopril', 'statin',
+                               'side effect', 'dosage', 'take', 'antibiotic'}),
+    'med_questions': frozenset({'what is', 'what does', 'how to take', 'side effects of',
+                                'interactions', 'used for', 'safe to'}),
+    # Symptom Checker (Priority 3)
+    # ('ache' only matches at a word start, so compound aches are listed explicitly)
+    'symptom_phrases': frozenset({'i have', 'i feel', 'i am feeling', 'experiencing',
+                                  'pain in', 'hurts', 'ache', 'aching', 'sore',
+                                  'headache', 'toothache', 'backache', 'stomachache',
+                                  'earache', 'bellyache', 'tummyache'}),
+    'symptom_words': frozenset({'headache', 'fever', 'cough', 'nausea', 'dizzy', 'tired',
+                                'fatigue', 'bleeding', 'swelling', 'rash', 'infection'}),
+    # Wellness & Nutrition (Priority 4)
+    'wellness_topics': frozenset({'sleep', 'diet', 'nutrition', 'exercise', 'food', 'eat',
+                                  'weight', 'fitness', 'healthy', 'health tips', 'wellness',
+                                  'heart health', 'immune', 'energy', 'meal'}),
+    'wellness_actions': frozenset({'improve', 'boost', 'better', 'tips', 'how to', 'ways to',
+                                   'help me', 'advice', 'recommend'}),
+    # Health Summary (Priority 5)
+    'summary_keywords': frozenset({'summary', 'status', 'report', 'history', 'overview',
+                                   'show my', 'my health', 'my data', 'trends'})
+}
+
+
+def _build_keyword_scanner(keyword_tags: Dict[str, Set[str]], word_start: bool = False):
+    """
+    Compile tagged keywords into a single pattern.
+    
+    The pattern reports every (possibly overlapping) keyword occurrence, and
+    each keyword also carries the tags of any shorter keyword it contains, so
+    one scan finds the same tags as testing every keyword with `in`.
+    
+    Args:
+        keyword_tags: Mapping of lowercase keyword to its tags
+        word_start: Only match keywords that start at a word boundary
+        
+    Returns:
+        Tuple of (compiled pattern, keyword -> tags table)
+    """
+    prefix = r'(?<!\w)' if word_start else ''
+    tags = {keyword: set(keyword_tag) for keyword, keyword_tag in keyword_tags.items()}
+    for keyword in tags:
+        for other, other_tags in keyword_tags.items():
+            if other != keyword and re.search(prefix + re.escape(other), keyword):
+                tags[keyword] |= other_tags
+    
+    # Longest first so the lookahead reports the longest keyword at each position
+    alternation = '|'.join(map(re.escape, sorted(tags, key=len, reverse=True)))
+    pattern = re.compile(f'{prefix}(?=({alternation}))')
+    return pattern, {keyword: frozenset(tag) for keyword, tag in tags.items()}
+
+
+def _scan_keywords(pattern, tags: Dict[str, FrozenSet[str]], text: str) -> Set[str]:
+    """Return the union of tags of all keywords found in text."""
+    found = set()
+    for match in pattern.finditer(text):
+        found |= tags[match.group(1)]
+    return found
+
+
+_alert_tags = {}
+for _keyword in EMERGENCY_KEYWORDS:
+    _alert_tags.setdefault(_keyword, set()).add('emergency')
+for _keyword in CRISIS_KEYWORDS:
+    _alert_tags.setdefault(_keyword, set()).add('crisis')
+_ALERT_PATTERN, _ALERT_TAGS = _build_keyword_scanner(_alert_tags)
+
+_rule_tags = {}
+for _group, _keywords in INTENT_RULE_KEYWORDS.items():
+    for _keyword in _keywords:
+        _rule_tags.setdefault(_keyword, set()).add(_group)
+_RULE_PATTERN, _RULE_TAGS = _build_keyword_scanner(_rule_tags, word_start=True)
+
+
+# Knowledge graph categories used as entity gazetteers, in priority order
+_CATEGORY_TO_BUCKET = {
+    'symptom': 'symptoms',
+    'condition': 'symptoms',
+    'medication': 'medications'
+}
+
+# Entity vocabulary not covered by knowledge graph keywords
+BODY_PARTS = [
+    'head', 'face', 'eye', 'eyes', 'ear', 'ears', 'nose', 'mouth', 'jaw',
+    'throat', 'neck', 'shoulder', 'shoulders', 'chest', 'heart', 'lungs',
+    'arm', 'arms', 'elbow', 'wrist', 'hand', 'hands', 'finger', 'fingers',
+    'back', 'stomach', 'abdomen', 'belly', 'hip', 'hips', 'leg', 'legs',
+    'knee', 'knees', 'ankle', 'ankles', 'foot', 'feet', 'toe', 'toes',
+    'skin', 'joint', 'joints', 'muscle', 'muscles'
+]
+PAIN_WORDS = ['pain', 'ache', 'aching', 'hurt', 'hurts', 'sore']
+
+
+def _build_entity_matcher(knowledge_graph_path):
+    """
+    Build a whole-word entity matcher from the knowledge graph keywords.
+    
+    All-caps keywords (acronyms such as HIV or ORS) only match in capitals;
+    every other term matches case-insensitively. Entries may refine their
+    keywords with 'keyword_categories' (keyword -> category, e.g. a condition
+    named in a medication entry) and 'non_entity_keywords' (keywords kept for
+    retrieval only because they are everyday words in chat text).
+    
+    Args:
+        knowledge_graph_path: Path to knowledge graph JSON
+        
+    Returns:
+        Tuple of (compiled pattern, lowercase term -> entity bucket table)
+    """
+    with open(knowledge_graph_path, 'r') as f:
+        knowledge_graph = json.load(f)
+    
+    term_buckets = {}
+    acronyms = set()
+    for category, bucket in _CATEGORY_TO_BUCKET.items():
+        for entry in knowledge_graph:
+            keyword_categories = entry.get('keyword_categories', {})
+            non_entity_keywords = entry.get('non_entity_keywords', [])
+            for keyword in entry['keywords']:
+                if keyword in non_entity_keywords:
+                    continue
+                if keyword_categories.get(keyword, entry['category']) == category:
+                    if keyword.isupper():
+                        acronyms.add(keyword)
+                    term_buckets.setdefault(keyword.lower(), bucket)
+    for term in BODY_PARTS:
+        term_buckets.setdefault(term, 'body_parts')
+    for term in PAIN_WORDS:
+        term_buckets.setdefault(term, 'symptoms')
+    
+    # Longest first so multi-word terms win over the words they contain
+    terms = [acronym for acronym in acronyms if acronym.lower() in term_buckets]
+    terms += [term for term in term_buckets if term.upper() not in acronyms]
+    alternation = '|'.join(
+        re.escape(term) if term in acronyms else f'(?i:{re.escape(term)})'
+        for term in sorted(terms, key=len, reverse=True)
+    )
+    pattern = re.compile(rf'(?<!\w)(?:{alternation})(?!\w)')
+    return pattern, term_buckets
+
+
+def _load_artifact(path: str):
+    """
+    Load a joblib artifact, shared between NLPProcessor instances until the file changes.
+    
+    Args:
+        path: Path to the artifact
+        
+    Returns:
+        The loaded object (treat as read-only, it is shared)
+    """
+    path = os.path.abspath(path)
+    return _load_artifact_version(path, os.stat(path).st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_artifact_version(path: str, mtime_ns: int):
+    """Load one version of an artifact (cached per absolute path and modification time)."""
+    # Heavy libraries are imported here so importing this module stays cheap
+    import joblib
+    
+    # Loaded into memory, not memory-mapped: the intent artifacts are small, and
+    # retraining overwrites the file in place under any mapping still in use
+    return joblib.load(path)
+
+
+def detect_alerts(text_lower: str) -> Set[str]:
+    """
+    Detect emergency and crisis phrases in a single pass.
+    
+    Args:
+        text_lower: Lowercased user query
+        
+    Returns:
+        Set containing 'emergency' and/or 'crisis'
+    """
+    return _scan_keywords(_ALERT_PATTERN, _ALERT_TAGS, text_lower)
+
+
+def emergency_response_type(text_lower: str) -> Optional[str]:
+    """
+    Decide which emergency response a query needs, if any.
+    
+    An emergency phrase mentioning the chest, heart, arm or jaw gets the
+    cardiac response; otherwise a crisis phrase gets the crisis response.
+    Other emergencies go through the normal pipeline.
+    
+    Args:
+        text_lower: Lowercased user query
+        
+    Returns:
+        'cardiac', 'crisis' or None
+    """
+    alerts = detect_alerts(text_lower)
+    if 'emergency' in alerts and CARDIAC_PATTERN.search(text_lower):
+        return 'cardiac'
+    if 'crisis' in alerts:
+        return 'crisis'
+    return None
+
+
+@dataclass(frozen=True)
+class ProcessedQuery:
+    """
+    User query normalized once and shared by every pipeline stage.
+    
+    Attributes:
+        sanitized: Stripped and length-limited text
+        lower: Lowercased sanitized text
+    """
+    sanitized: str
+    lower: str
+
+
+@dataclass(frozen=True)
+class NLPResult:
+    """
+    Intent and entities for one query, from NLPProcessor.process.
+    
+    Attributes:
+        query: The prepared query (reusable for search)
+        intent: Predicted intent
+        confidence: Confidence of the predicted intent
+        entities: Dictionary of entity types and their values
+    """
+    query: ProcessedQuery
+    intent: str
+    confidence: float
+    entities: Dict[str, List[str]]
+
 
 class NLPProcessor:
     """
     Handles all NLP operations including intent recognition and entity extraction.
     
+    Models:
+    - Intent: keyword rules, then a TF-IDF + SGD classifier (joblib artifacts,
+      loaded the first time a query falls through to the classifier)
+    - Entities: gazetteer built from knowledge graph keywords; no spaCy
+      pipeline is loaded, since en_core_web_sm has no symptom/disease labels
+    
     Security: Sanitizes user input to prevent injection attacks.
     """
     
-    def __init__(self, intent_model_path, vectorizer_path):
-        """Initialize NLP models."""
-        self.intent_model = joblib.load(intent_model_path)
-        self.vectorizer = joblib.load(vectorizer_path)
-        self.nlp = spacy.load("en_core_web_sm")
+    def __init__(self, intent_model_path, vectorizer_path, knowledge_graph_path):
+        """Initialize the entity gazetteer; intent models load on first use."""
+        # Fail at start-up, not on the first query that reaches the classifier
+        for path in (intent_model_path, vectorizer_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Model file not found: {path}")
+        self._intent_model_path = intent_model_path
+        self._vectorizer_path = vectorizer_path
+        self._intent_model = None
+        self._vectorizer = None
+        
+        self._entity_pattern, self._entity_buckets = _build_entity_matcher(knowledge_graph_path)
+        
+        # Repeated queries skip the classifier (cache lives and dies with these models)
+        self._predict_with_model = functools.lru_cache(maxsize=4096)(self._classify)
+        self._match_entities_cached = functools.lru_cache(maxsize=ENTITY_CACHE_SIZE)(self._match_entities)
+    
+    @property
+    def intent_model(self):
+        """Intent classifier, loaded on first access."""
+        if self._intent_model is None:
+            self._intent_model = _load_artifact(self._intent_model_path)
+        return self._intent_model
+    
+    @property
+    def vectorizer(self):
+        """Intent TF-IDF vectorizer, loaded on first access."""
+        if self._vectorizer is None:
+            self._vectorizer = _load_artifact(self._vectorizer_path)
+        return self._vectorizer
     
     def sanitize_input(self, text: str) -> str:
         """
@@ -26,114 +328,171 @@ class NLPProcessor:
         Returns:
             Sanitized text
         """
-        # Remove potential malicious characters
-        text = text.strip()
+        # Remove potential malicious characters (control characters become spaces)
+        text = _CONTROL_CHARS.sub(' ', text).strip()
         # Limit length to prevent buffer overflow attacks
-        text = text[:1000]
+        text = text[:MAX_QUERY_LENGTH]
         return text
     
-    def predict_intent(self, text: str) -> Tuple[str, float]:
+    def prepare_query(self, text: str) -> ProcessedQuery:
+        """
+        Sanitize and lowercase a query once for all pipeline stages.
+        
+        Args:
+            text: Raw user input
+            
+        Returns:
+            ProcessedQuery to pass to predict_intent, extract_entities and search
+        """
+        sanitized = self.sanitize_input(text)
+        return ProcessedQuery(sanitized=sanitized, lower=sanitized.lower())
+    
+    def _as_query(self, text: Union[str, ProcessedQuery]) -> ProcessedQuery:
+        """Accept either raw text or an already prepared query."""
+        if isinstance(text, ProcessedQuery):
+            return text
+        return self.prepare_query(text)
+    
+    def process(self, text: str) -> NLPResult:
+        """
+        Sanitize a query once, then predict its intent and extract its entities.
+        
+        Args:
+            text: Raw user input
+            
+        Returns:
+            NLPResult with the prepared query, intent, confidence and entities
+        """
+        query = self.prepare_query(text)
+        intent, confidence = self._predict_intent(query)
+        return NLPResult(query, intent, confidence, self._extract_entities(query.sanitized))
+    
+    def predict_intent(self, text: Union[str, ProcessedQuery]) -> Tuple[str, float]:
         """
         Predict user intent using hybrid rule-based + ML approach.
         """
-        text = self.sanitize_input(text)
-        text_lower = text.lower()
+        return self._predict_intent(self._as_query(text))
+    
+    def _predict_intent(self, query: ProcessedQuery) -> Tuple[str, float]:
+        """Predict intent for an already prepared query."""
+        text = query.sanitized
+        text_lower = query.lower
         
         # RULE-BASED CLASSIFICATION (High Confidence)
         # These patterns have 95%+ accuracy
+        # One scan collects every rule keyword group present in the text
+        hits = _scan_keywords(_RULE_PATTERN, _RULE_TAGS, text_lower)
         
         # Mental Health & Stress (Priority 1)
-        stress_keywords = ['stress', 'stressed', 'anxiety', 'anxious', 'panic', 'worry', 
-                          'worried', 'overwhelm', 'nervous', 'fear', 'depression', 
-                          'depressed', 'sad', 'hopeless', 'burnout']
-        stress_actions = ['reduce', 'manage', 'cope', 'deal', 'handle', 'help', 'relief']
-        
-        if any(kw in text_lower for kw in stress_keywords):
-            if any(act in text_lower for act in stress_actions) or '?' in text:
+        if 'stress_keywords' in hits:
+            if 'stress_actions' in hits or '?' in text:
                 return 'mental_health', 0.95
         
         # Medication Queries (Priority 2)
-        med_keywords = ['medication', 'medicine', 'drug', 'pill', 'prescription', 
-                       'metformin', 'aspirin', 'ibuprofen', 'lisinopril', 'statin',
-                       'side effect', 'dosage', 'take', 'antibiotic']
-        med_questions = ['what is', 'what does', 'how to take', 'side effects of',
-                        'interactions', 'used for', 'safe to']
-        
-        if any(kw in text_lower for kw in med_keywords):
-            if any(q in text_lower for q in med_questions):
-                return 'medication_explainer', 0.95
+        if 'med_keywords' in hits and 'med_questions' in hits:
+            return 'medication_explainer', 0.95
         
         # Symptom Checker (Priority 3)
-        symptom_phrases = ['i have', 'i feel', 'i am feeling', 'experiencing',
-                          'pain in', 'hurts', 'ache', 'aching', 'sore']
-        symptom_words = ['headache', 'fever', 'cough', 'nausea', 'dizzy', 'tired',
-                        'fatigue', 'bleeding', 'swelling', 'rash', 'infection']
-        
-        if any(phrase in text_lower for phrase in symptom_phrases):
+        if 'symptom_phrases' in hits:
             return 'symptom_checker', 0.90
         
-        if any(word in text_lower for word in symptom_words):
+        if 'symptom_words' in hits:
             return 'symptom_checker', 0.85
         
         # Wellness & Nutrition (Priority 4)
-        wellness_topics = ['sleep', 'diet', 'nutrition', 'exercise', 'food', 'eat',
-                          'weight', 'fitness', 'healthy', 'health tips', 'wellness',
-                          'heart health', 'immune', 'energy', 'meal']
-        wellness_actions = ['improve', 'boost', 'better', 'tips', 'how to', 'ways to',
-                           'help me', 'advice', 'recommend']
-        
-        if any(topic in text_lower for topic in wellness_topics):
-            if any(action in text_lower for action in wellness_actions):
-                return 'general_wellness', 0.90
+        if 'wellness_topics' in hits and 'wellness_actions' in hits:
+            return 'general_wellness', 0.90
         
         # Health Summary (Priority 5)
-        summary_keywords = ['summary', 'status', 'report', 'history', 'overview',
-                           'show my', 'my health', 'my data', 'trends']
-        
-        if any(kw in text_lower for kw in summary_keywords):
+        if 'summary_keywords' in hits:
             return 'health_summary', 0.95
         
         # FALLBACK TO ML MODEL (Lower Confidence)
-        text_vec = self.vectorizer.transform([text])
-        intent = self.intent_model.predict(text_vec)[0]
-        proba = self.intent_model.predict_proba(text_vec)
-        confidence = np.max(proba)
+        return self._predict_with_model(text_lower)
+    
+    def _classify(self, text_lower: str) -> Tuple[str, float]:
+        """
+        Run the ML intent classifier (wrapped in a per-instance LRU cache).
         
-        return intent, confidence
+        Args:
+            text_lower: Sanitized, lowercased text (the vectorizer lowercases anyway)
+            
+        Returns:
+            Tuple of (intent, confidence)
+        """
+        # One classifier pass: class and confidence both come from the probabilities
+        text_vec = self.vectorizer.transform([text_lower])
+        proba = self.intent_model.predict_proba(text_vec)[0]
+        best = proba.argmax()
+        
+        return self.intent_model.classes_[best], float(proba[best])
     
-    def extract_entities(self, text: str) -> Dict[str, List[str]]:
+    def extract_entities(self, text: Union[str, ProcessedQuery]) -> Dict[str, List[str]]:
         """
-        Extract medical entities from text using spaCy.
+        Extract medical entities from text using knowledge graph gazetteers.
         
         Args:
-            text: User query
+            text: User query (raw text or ProcessedQuery)
             
         Returns:
             Dictionary of entity types and their values
         """
-        text = self.sanitize_input(text)
-        doc = self.nlp(text)
+        return self._extract_entities(self._as_query(text).sanitized)
+    
+    def _extract_entities(self, text: str) -> Dict[str, List[str]]:
+        """Extract entities from already sanitized text (fresh dict per call)."""
+        return {bucket: list(terms) for bucket, terms in self._match_entities_cached(text)}
+    
+    def _match_entities(self, text: str) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+        """
+        Match gazetteer terms in sanitized text (wrapped in a per-instance LRU cache).
         
-        entities = {
+        Returns:
+            Immutable (entity type, terms) pairs, so cached results cannot be modified
+        """
+        entities = self._empty_entities()
+        
+        # Single pass over the text; each whole-word term maps to its bucket
+        for match in self._entity_pattern.finditer(text):
+            term = match.group(0)
+            entities[self._entity_buckets.get(term.lower(), 'general')].append(term)
+        
+        return tuple((bucket, tuple(terms)) for bucket, terms in entities.items())
+    
+    def extract_entities_batch(self, texts: List[Union[str, ProcessedQuery]]) -> List[Dict[str, List[str]]]:
+        """
+        Extract medical entities from several texts with a single scan.
+        
+        Args:
+            texts: User queries (raw text or ProcessedQuery)
+            
+        Returns:
+            List of entity dictionaries, one per text (same order as texts)
+        """
+        sanitized = [self._as_query(text).sanitized for text in texts]
+        results = [self._empty_entities() for _ in sanitized]
+        
+        # Start offset of each text inside the joined string
+        starts = []
+        offset = 0
+        for text in sanitized:
+            starts.append(offset)
+            offset += len(text) + 1
+        
+        # No gazetteer term spans a newline, so matches never cross texts
+        for match in self._entity_pattern.finditer('\n'.join(sanitized)):
+            entities = results[bisect.bisect_right(starts, match.start()) - 1]
+            term = match.group(0)
+            entities[self._entity_buckets.get(term.lower(), 'general')].append(term)
+        
+        return results
+    
+    @staticmethod
+    def _empty_entities() -> Dict[str, List[str]]:
+        """Create the empty entity dictionary returned by extract_entities."""
+        return {
             'symptoms': [],
             'body_parts': [],
             'medications': [],
             'general': []
         }
-        
-        # Extract named entities
-        for ent in doc.ents:
-            if ent.label_ in ['DISEASE', 'SYMPTOM']:
-                entities['symptoms'].append(ent.text)
-            elif ent.label_ in ['PRODUCT', 'ORG']:
-                entities['medications'].append(ent.text)
-            else:
-                entities['general'].append(ent.text)
-        
-        # Extract noun chunks for body parts and symptoms
-        for chunk in doc.noun_chunks:
-            text_lower = chunk.text.lower()
-            if any(word in text_lower for word in ['pain', 'ache', 'hurt', 'sore']):
-                entities['symptoms'].append(chunk.text)
-        
-        return entities
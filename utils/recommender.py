@@ -1,5 +1,10 @@
-from typing import Dict, List, Tuple
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
 import random
+import numpy as np
+
+# Nudge types by rule number (0 = no nudge), in rule priority order
+NUDGE_TYPES = np.array([None, "sleep_hygiene", "stress_management", "physical_activity"], dtype=object)
 
 class WellnessRecommender:
     """
@@ -16,6 +21,13 @@ class WellnessRecommender:
             wellness_tips: List of wellness tip dictionaries
         """
         self.wellness_tips = wellness_tips
+        
+        # Index of tip positions by health goal
+        by_goal = defaultdict(list)
+        for idx, tip in enumerate(wellness_tips):
+            for goal in tip.get('health_goals', []):
+                by_goal[goal].append(idx)
+        self._by_goal = dict(by_goal)
     
     def get_recommendation(self, user_profile: Dict) -> Dict:
         """
@@ -29,19 +41,16 @@ class WellnessRecommender:
         """
         health_goals = user_profile.get('health_goals', ['general_wellness'])
         
-        # Filter tips matching user's goals
-        matching_tips = []
-        for tip in self.wellness_tips:
-            tip_goals = tip.get('health_goals', [])
-            if any(goal in tip_goals for goal in health_goals):
-                matching_tips.append(tip)
+        # Tips matching user's goals (a set, so tips matching several goals count once)
+        matching = set()
+        for goal in health_goals:
+            matching.update(self._by_goal.get(goal, ()))
         
         # If no matches, return random tip
-        if not matching_tips:
-            matching_tips = self.wellness_tips
-        
-        # Select best matching tip
-        selected_tip = random.choice(matching_tips)
+        if matching:
+            selected_tip = self.wellness_tips[random.choice(tuple(matching))]
+        else:
+            selected_tip = random.choice(self.wellness_tips)
         
         return {
             'tip': selected_tip,
@@ -74,3 +83,28 @@ class WellnessRecommender:
             return True, "physical_activity"
         
         return False, None
+    
+    def check_proactive_nudges_batch(self, avg_sleep_hours: Sequence[float],
+                                     daily_steps: Sequence[int],
+                                     stress_levels: Sequence[str]) -> List[Optional[str]]:
+        """
+        Check many users for proactive nudges at once.
+        
+        Applies the same rules as check_proactive_nudge, vectorized over
+        per-user columns (e.g. for a dashboard or scheduled job).
+        
+        Args:
+            avg_sleep_hours: Average sleep hours per user
+            daily_steps: Daily step count per user
+            stress_levels: Stress level per user ('low', 'medium' or 'high')
+            
+        Returns:
+            Nudge type per user (None when no nudge is needed), in input order
+        """
+        sleep_hours = np.asarray(avg_sleep_hours, dtype=np.float64)
+        steps = np.asarray(daily_steps, dtype=np.float64)
+        high_stress = np.asarray(stress_levels, dtype=object) == 'high'
+        
+        # First matching rule wins, as in check_proactive_nudge
+        rule = np.select([sleep_hours < 6, high_stress, steps < 3000], [1, 2, 3], default=0)
+        return NUDGE_TYPES[rule].tolist()
@@ -1,7 +1,27 @@
-from PIL import Image
-import pytesseract
+import asyncio
 import re
-from typing import Dict
+import numpy as np
+from typing import Dict, List
+
+# LSTM engine only, and treat the page as one block of text (skips layout analysis)
+TESSERACT_CONFIG = '--oem 1 --psm 6'
+
+
+def _otsu_threshold(gray: np.ndarray) -> int:
+    """Return the Otsu threshold of a uint8 grayscale array."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    weight_low = np.cumsum(hist)
+    weight_high = weight_low[-1] - weight_low
+    mass_low = np.cumsum(hist * np.arange(256))
+    mean_total = mass_low[-1] / weight_low[-1]
+    
+    # Between-class variance for every candidate threshold (up to a constant factor);
+    # thresholds leaving one class empty split nothing and score 0
+    spread = (mean_total * weight_low - mass_low) ** 2
+    weights = weight_low * weight_high
+    variance = np.divide(spread, weights, out=np.zeros_like(spread), where=weights > 0)
+    return int(np.argmax(variance))
+
 
 class MedicalReportProcessor:
     """
@@ -23,6 +43,17 @@ class MedicalReportProcessor:
             medical_terms: Dictionary mapping complex terms to simple explanations
         """
         self.medical_terms = medical_terms
+        
+        # One case-insensitive pattern for all terms, longest first so the
+        # longest term wins where terms overlap
+        sorted_terms = sorted(medical_terms, key=len, reverse=True)
+        self._term_lookup = {}
+        for term in sorted_terms:
+            self._term_lookup.setdefault(term.lower(), term)
+        self._term_pattern = (
+            re.compile('|'.join(map(re.escape, sorted_terms)), re.IGNORECASE)
+            if sorted_terms else None
+        )
     
     def extract_text_from_image(self, image) -> str:
         """
@@ -34,15 +65,52 @@ class MedicalReportProcessor:
         Returns:
             Extracted text
         """
+        import pytesseract
+        from PIL import Image, ImageFilter
+        
         # Preprocess image for better OCR
-        # Convert to grayscale
-        image = image.convert('L')
+        # Convert to grayscale and remove speckle noise
+        image = image.convert('L').filter(ImageFilter.MedianFilter(3))
+        
+        # Binarize with Otsu's threshold
+        gray = np.asarray(image)
+        binary = np.where(gray > _otsu_threshold(gray), 255, 0).astype(np.uint8)
         
         # Extract text
-        text = pytesseract.image_to_string(image)
+        text = pytesseract.image_to_string(Image.fromarray(binary), config=TESSERACT_CONFIG)
         
         return text.strip()
     
+    async def extract_text_from_image_async(self, image) -> str:
+        """
+        Run extract_text_from_image in a worker thread.
+        
+        Tesseract runs as a separate process, so several pages can be
+        OCR'd in parallel without blocking the event loop.
+        
+        Args:
+            image: PIL Image object
+            
+        Returns:
+            Extracted text
+        """
+        return await asyncio.to_thread(self.extract_text_from_image, image)
+    
+    async def process_pages(self, images: List) -> Dict:
+        """
+        OCR all pages of a report concurrently, then simplify the full text.
+        
+        Args:
+            images: PIL Image objects, one per page (in page order)
+            
+        Returns:
+            Dictionary with simplified text and found terms (see simplify_medical_terms)
+        """
+        pages = await asyncio.gather(
+            *(self.extract_text_from_image_async(image) for image in images)
+        )
+        return self.simplify_medical_terms('\n\n'.join(pages))
+    
     def simplify_medical_terms(self, text: str) -> Dict:
         """
         Replace complex medical terms with simple explanations.
@@ -53,29 +121,27 @@ class MedicalReportProcessor:
         Returns:
             Dictionary with simplified text and found terms
         """
-        simplified_text = text
-        found_terms = []
+        found_terms = {}
         
-        # Sort terms by length (longest first) to avoid partial replacements
-        sorted_terms = sorted(self.medical_terms.items(), 
-                            key=lambda x: len(x[0]), 
-                            reverse=True)
+        def annotate(match):
+            complex_term = self._term_lookup.get(match.group(0).lower())
+            if complex_term is None:
+                return match.group(0)
+            simple_term = self.medical_terms[complex_term]
+            found_terms.setdefault(complex_term, {
+                'complex': complex_term,
+                'simple': simple_term
+            })
+            return f"{complex_term} ({simple_term})"
         
-        for complex_term, simple_term in sorted_terms:
-            # Case-insensitive replacement
-            pattern = re.compile(re.escape(complex_term), re.IGNORECASE)
-            if pattern.search(simplified_text):
-                found_terms.append({
-                    'complex': complex_term,
-                    'simple': simple_term
-                })
-                simplified_text = pattern.sub(
-                    f"{complex_term} ({simple_term})", 
-                    simplified_text
-                )
+        # Single pass over the original text; explanations are never re-scanned
+        if self._term_pattern is not None:
+            simplified_text = self._term_pattern.sub(annotate, text)
+        else:
+            simplified_text = text
         
         return {
             'original_text': text,
             'simplified_text': simplified_text,
-            'terms_found': found_terms
+            'terms_found': list(found_terms.values())
         }
\ No newline at end of file